@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
-import folium
-from folium.plugins import HeatMap, FastMarkerCluster
-from streamlit_folium import st_folium
+
+from data import get_df, get_options
+from explorer import explorer
+from filters import apply_filters
 
 # -------------------------------------------------------
 # PAGE CONFIG
@@ -25,41 +25,19 @@ st.markdown(
 # -------------------------------------------------------
 # LOAD DATA
 # -------------------------------------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("collision.csv")
-    df = df.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
-
-    if df["collision_severity"].dtype.kind in ("i", "u"):
-        df["collision_severity"] = df["collision_severity"].map(
-            {1: "Fatal", 2: "Serious", 3: "Slight"}
-        )
-
-    for c in [
-        "collision_severity",
-        "weather_conditions",
-        "light_conditions",
-        "road_type",
-    ]:
-        df[c] = df[c].astype(str).str.strip()
-
-    df["collision_year"] = pd.to_numeric(df["collision_year"], errors="coerce")
-
-    return df
-
-
-df = load_data()
+df = get_df()
+options = get_options()
 
 # -------------------------------------------------------
 # DEFAULT FILTERS
 # -------------------------------------------------------
 DEFAULTS = {
     "map_mode": "Cluster",
-    "severity": sorted(df["collision_severity"].unique()),
-    "years": (int(df["collision_year"].min()), int(df["collision_year"].max())),
-    "weather": sorted(df["weather_conditions"].unique()),
-    "light": sorted(df["light_conditions"].unique()),
-    "road": sorted(df["road_type"].unique()),
+    "severity": options["severity"],
+    "years": options["years"],
+    "weather": options["weather"],
+    "light": options["light"],
+    "road": options["road"],
 }
 
 # -------------------------------------------------------
@@ -69,12 +47,14 @@ for key, value in DEFAULTS.items():
     if key not in st.session_state:
         st.session_state[key] = value
 
-if "map_object" not in st.session_state:
-    st.session_state.map_object = None
-
 if "df_filtered" not in st.session_state:
     st.session_state.df_filtered = None
 
+# Signature the stored frame was filtered with, used to skip re-filtering
+# when an apply does not change the filters.
+if "filter_sig" not in st.session_state:
+    st.session_state.filter_sig = None
+
 if "initialized" not in st.session_state:
     st.session_state.initialized = False
 
@@ -89,32 +69,32 @@ with st.sidebar:
 
         severity = st.multiselect(
             "Severity",
-            sorted(df["collision_severity"].unique()),
+            options["severity"],
             default=st.session_state.severity,
         )
 
         years = st.slider(
             "Year Range",
-            DEFAULTS["years"][0],
-            DEFAULTS["years"][1],
+            options["years"][0],
+            options["years"][1],
             st.session_state.years,
         )
 
         weather = st.multiselect(
             "Weather",
-            sorted(df["weather_conditions"].unique()),
+            options["weather"],
             default=st.session_state.weather,
         )
 
         light = st.multiselect(
             "Lighting",
-            sorted(df["light_conditions"].unique()),
+            options["light"],
             default=st.session_state.light,
         )
 
         road = st.multiselect(
             "Road Type",
-            sorted(df["road_type"].unique()),
+            options["road"],
             default=st.session_state.road,
         )
 
@@ -123,17 +103,16 @@ with st.sidebar:
         reset_btn = col2.form_submit_button("Reset filters")
 
 # -------------------------------------------------------
-# FILTER FUNCTION
+# FILTER SIGNATURE
 # -------------------------------------------------------
-@st.cache_data
-def apply_filters(df, sev, years, weather, light, road):
-    return df[
-        (df["collision_severity"].isin(sev))
-        & (df["collision_year"].between(years[0], years[1]))
-        & (df["weather_conditions"].isin(weather))
-        & (df["light_conditions"].isin(light))
-        & (df["road_type"].isin(road))
-    ].copy()
+def signature():
+    return (
+        tuple(st.session_state.severity),
+        tuple(st.session_state.years),
+        tuple(st.session_state.weather),
+        tuple(st.session_state.light),
+        tuple(st.session_state.road),
+    )
 
 # -------------------------------------------------------
 # RESET FILTERS
@@ -141,7 +120,6 @@ def apply_filters(df, sev, years, weather, light, road):
 if reset_btn:
     for key, value in DEFAULTS.items():
         st.session_state[key] = value
-    st.session_state.map_object = None
     st.session_state.initialized = False
     st.rerun()
 
@@ -157,39 +135,21 @@ if apply_btn or not st.session_state.initialized:
     st.session_state.light = light
     st.session_state.road = road
 
-    with st.spinner("Updating map..."):
-        df_filtered = apply_filters(
-            df,
-            st.session_state.severity,
-            st.session_state.years,
-            st.session_state.weather,
-            st.session_state.light,
-            st.session_state.road,
-        )
-
-        if df_filtered.empty:
-            st.warning("No data available for the selected filters.")
-            st.stop()
+    sig = signature()
 
-        st.session_state.df_filtered = df_filtered
+    with st.spinner("Applying filters..."):
+        # Only re-filter when the filters changed; switching the map mode
+        # reuses the stored frame.
+        if sig != st.session_state.filter_sig:
+            df_filtered = apply_filters(df, sig)
 
-        coords = df_filtered[["latitude", "longitude"]].values.tolist()
+            if df_filtered.empty:
+                st.warning("No data available for the selected filters.")
+                st.stop()
 
-        min_lat, max_lat = df_filtered["latitude"].min(), df_filtered["latitude"].max()
-        min_lon, max_lon = df_filtered["longitude"].min(), df_filtered["longitude"].max()
+            st.session_state.df_filtered = df_filtered
+            st.session_state.filter_sig = sig
 
-        m = folium.Map(
-            location=[(min_lat + max_lat) / 2, (min_lon + max_lon) / 2],
-            zoom_start=6,
-            tiles="cartodb positron",
-        )
-
-        if st.session_state.map_mode == "Cluster":
-            FastMarkerCluster(coords).add_to(m)
-        else:
-            HeatMap(coords, radius=8, blur=12).add_to(m)
-
-        st.session_state.map_object = m
         st.session_state.initialized = True
 
 # -------------------------------------------------------
@@ -199,7 +159,9 @@ if st.session_state.df_filtered is not None:
     df_filtered = st.session_state.df_filtered
 
     total = len(df_filtered)
-    fatal = (df_filtered["collision_severity"] == "Fatal").sum()
+    # Categorical value_counts is a bincount over the int8 codes, so no
+    # full-length comparison mask is built just to count one category.
+    fatal = int(df_filtered["collision_severity"].value_counts().get("Fatal", 0))
 
     st.markdown(
         f"""
@@ -212,14 +174,18 @@ if st.session_state.df_filtered is not None:
     )
 
 # -------------------------------------------------------
-# MAP RENDER (ONCE)
+# MAP RENDER
 # -------------------------------------------------------
-if st.session_state.map_object is not None:
-    st_folium(
-        st.session_state.map_object,
-        width=1300,
+# The component keeps its own copy of the data in the browser, so only the
+# applied filter values are sent on each rerun. They come from filter_sig,
+# the filters df_filtered was built with, so the map always matches the
+# summary even after an apply that returned no rows.
+if st.session_state.df_filtered is not None:
+    explorer(
+        st.session_state.map_mode,
+        *st.session_state.filter_sig,
         height=900,
-        returned_objects=[]
+        key="collision_map",
     )
 
 
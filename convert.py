@@ -0,0 +1,134 @@
+"""
+One-off conversion of the raw STATS19 collision CSV into the Parquet dataset
+read by the Streamlit app. The dataset is partitioned by collision_year so
+that year-range filters only open the matching files.
+
+It also writes the same rows as a single Arrow IPC file for the map
+component, which loads it once and filters it in the browser.
+
+Run once after pulling the data (and again whenever collision.csv changes):
+
+    python convert.py
+"""
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+SOURCE = "collision.csv"
+TARGET = "collision_ds"
+EXPLORER_TARGET = "frontend/collisions.arrow"
+# filters.CACHE_DIR; its entries are keyed on the old data and never hit again.
+FILTER_CACHE = "filter_cache"
+
+# Only the columns the app reads are kept.
+COLUMNS = [
+    "latitude",
+    "longitude",
+    "collision_severity",
+    "collision_year",
+    "weather_conditions",
+    "light_conditions",
+    "road_type",
+]
+
+CATEGORICAL = [
+    "collision_severity",
+    "weather_conditions",
+    "light_conditions",
+    "road_type",
+]
+
+
+def convert(source=SOURCE, target=TARGET):
+    df = pd.read_csv(
+        source,
+        usecols=COLUMNS,
+        dtype={"latitude": "float32", "longitude": "float32"},
+    )
+    # Rows without a year can never pass the year-range filter, so drop them
+    # here rather than carrying a nullable column into the app. Dropping
+    # before the category conversion also keeps every category in use.
+    df["collision_year"] = pd.to_numeric(df["collision_year"], errors="coerce")
+    df = df.dropna(
+        subset=["latitude", "longitude", "collision_year"]
+    ).reset_index(drop=True)
+
+    if df["collision_severity"].dtype.kind in ("i", "u"):
+        df["collision_severity"] = df["collision_severity"].map(
+            {1: "Fatal", 2: "Serious", 3: "Slight"}
+        )
+
+    for c in CATEGORICAL:
+        df[c] = df[c].astype(str).str.strip().astype("category")
+
+    df["collision_year"] = df["collision_year"].astype("int16")
+
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        target,
+        format="parquet",
+        partitioning=["collision_year"],
+        partitioning_flavor="hive",
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression="zstd"
+        ),
+        existing_data_behavior="delete_matching",
+    )
+    return df
+
+
+def write_atomic(target, write):
+    # Run write() against a private temporary path and rename the result
+    # over target, so other processes never see a partly written file or
+    # dataset. If anything fails the temporary path is removed before the
+    # error propagates. Returns whatever write() returned.
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        result = write(tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        raise
+    return result
+
+
+def write_explorer_data(df, target=EXPLORER_TARGET):
+    # Sorted by year so the browser can binary-search the year range. The
+    # text columns go in as their int8 codes, with the category labels in
+    # the schema metadata. The file is left uncompressed because Arrow JS
+    # cannot read compressed IPC buffers, and renamed into place so the
+    # browser never fetches a partly written file.
+    df = df.sort_values("collision_year", kind="stable")
+    table = pa.table(
+        {
+            "latitude": df["latitude"].to_numpy(),
+            "longitude": df["longitude"].to_numpy(),
+            "collision_year": df["collision_year"].to_numpy(),
+            **{c: df[c].cat.codes.to_numpy() for c in CATEGORICAL},
+        }
+    )
+    categories = {c: df[c].cat.categories.tolist() for c in CATEGORICAL}
+    table = table.replace_schema_metadata({"categories": json.dumps(categories)})
+    write_atomic(
+        target,
+        lambda tmp: feather.write_feather(table, tmp, compression="uncompressed"),
+    )
+
+
+if __name__ == "__main__":
+    df = convert()
+    print(f"Wrote {len(df):,} rows to {TARGET}")
+    write_explorer_data(df)
+    print(f"Wrote {len(df):,} rows to {EXPLORER_TARGET}")
+    shutil.rmtree(FILTER_CACHE, ignore_errors=True)
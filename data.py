@@ -0,0 +1,104 @@
+"""
+Loading of the preprocessed collision dataset shared by the app pages.
+"""
+import hashlib
+import os
+
+import streamlit as st
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import convert
+
+COLUMNS = [
+    "latitude",
+    "longitude",
+    "collision_severity",
+    "collision_year",
+    "weather_conditions",
+    "light_conditions",
+    "road_type",
+]
+
+
+def build_dataset():
+    # The generated dataset is not committed, so a fresh checkout (or a
+    # deployment that never ran convert.py) builds it from collision.csv on
+    # first load. It is written under a private name and renamed into place,
+    # so a worker never opens a half-written dataset; if another worker got
+    # there first, its copy is kept and this one discarded.
+    if os.path.isdir(convert.TARGET):
+        return
+    try:
+        df = convert.write_atomic(
+            convert.TARGET, lambda tmp: convert.convert(target=tmp)
+        )
+    except OSError:
+        # The rename fails when another worker's dataset is already there.
+        if not os.path.isdir(convert.TARGET):
+            raise
+        return
+    # Any existing Arrow file was written from the old data; the map has to
+    # filter the same rows (and category codes) the summary counts.
+    convert.write_explorer_data(df)
+
+
+@st.cache_resource
+def load_dataset():
+    # collision_ds/ is produced by convert.py, which already drops rows
+    # without coordinates, cleans the text columns and sets the dtypes.
+    # Declaring the partition type keeps the year as int16 on the Arrow side,
+    # so no cast pass is needed after conversion.
+    partitioning = ds.partitioning(
+        pa.schema([("collision_year", pa.int16())]), flavor="hive"
+    )
+    build_dataset()
+    return ds.dataset(convert.TARGET, format="parquet", partitioning=partitioning)
+
+
+# Changes whenever convert.py rewrites the dataset, so anything persisted
+# from it outside this process can be keyed on the data it came from.
+@st.cache_resource
+def data_version():
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(load_dataset().files):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+# cache_resource keeps one frame per process, shared by every session and
+# page, instead of cache_data's per-call copy. Callers must not mutate it.
+@st.cache_resource
+def get_df():
+    table = load_dataset().to_table(columns=COLUMNS)
+    # Keep the numpy-backed categoricals (the filters gather on their int8
+    # codes) but convert column by column, releasing each Arrow buffer as it
+    # goes, so the load does not hold two full copies at once.
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    # The filters slice the year range directly, so the frame must be sorted
+    # by year. The hive partitions normally come back in year order already;
+    # only sort (a full copy) when they do not.
+    if not df["collision_year"].is_monotonic_increasing:
+        df = df.sort_values("collision_year", kind="stable", ignore_index=True)
+    # The map component reads its own copy of the rows; write it from this
+    # frame when the checkout does not have one yet.
+    if not os.path.exists(convert.EXPLORER_TARGET):
+        convert.write_explorer_data(df)
+    return df
+
+
+# Filter choices for the sidebar. The categories are already the distinct
+# values, and the frame is sorted by year, so nothing here scans the rows.
+@st.cache_resource
+def get_options():
+    df = get_df()
+    year = df["collision_year"]
+    return {
+        "severity": sorted(df["collision_severity"].cat.categories),
+        "years": (int(year.iloc[0]), int(year.iloc[-1])),
+        "weather": sorted(df["weather_conditions"].cat.categories),
+        "light": sorted(df["light_conditions"].cat.categories),
+        "road": sorted(df["road_type"].cat.categories),
+    }
@@ -0,0 +1,33 @@
+"""
+Streamlit component that filters and maps the collisions in the browser.
+
+The frontend lives in frontend/ and reads frontend/collisions.arrow, which
+convert.py writes alongside the Parquet dataset.
+"""
+import os
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+
+_component = components.declare_component("explorer", path=FRONTEND_DIR)
+
+
+def explorer(mode, severity, years, weather, light, road, height=900, key=None):
+    """
+    Render the collision map for the given filter values.
+
+    The data is only transferred the first time the component loads; later
+    calls send just these arguments and the browser re-filters its copy.
+    """
+    return _component(
+        mode=mode,
+        severity=list(severity),
+        years=[int(years[0]), int(years[1])],
+        weather=list(weather),
+        light=list(light),
+        road=list(road),
+        height=height,
+        key=key,
+        default=None,
+    )
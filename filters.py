@@ -0,0 +1,135 @@
+"""
+Row filtering for the collision frame returned by data.get_df().
+"""
+import hashlib
+import os
+
+import streamlit as st
+import numpy as np
+from numba import njit
+
+import convert
+from data import data_version
+
+# Filter results shared by every Streamlit worker process on this machine.
+CACHE_DIR = "filter_cache"
+# Entries kept on disk, and in each process's memory; the least recently
+# used beyond this are dropped.
+CACHE_MAX_FILES = 32
+
+
+def category_lut(col, selected):
+    # One boolean slot per category code, so each row is tested by indexing
+    # with its int8 code instead of hashing its string value. Missing values
+    # have code -1, which lands on the trailing False slot.
+    lut = np.zeros(len(col.cat.categories) + 1, dtype=np.bool_)
+    idx = col.cat.categories.get_indexer(selected)
+    lut[idx[idx >= 0]] = True
+    return lut
+
+
+# All four lookups happen in one pass that writes a single mask, instead
+# of building a mask per column and ANDing them together. The loop is a
+# memory-bound int8 gather, so it runs serially: a parallel kernel would
+# need a threading layer that tolerates launches from Streamlit's session
+# threads, and neither OpenMP nor TBB is guaranteed to be installed.
+@njit(cache=True)
+def fused_mask(sev, weather, light, road, sev_lut, weather_lut, light_lut, road_lut):
+    out = np.empty(sev.size, dtype=np.bool_)
+    for i in range(sev.size):
+        out[i] = (
+            sev_lut[sev[i]]
+            & weather_lut[weather[i]]
+            & light_lut[light[i]]
+            & road_lut[road[i]]
+        )
+    return out
+
+
+def compute_indices(df, sig):
+    sev, years, weather, light, road = sig
+    # The frame is sorted by year, so the year range is a contiguous slice.
+    lo, hi = np.searchsorted(
+        df["collision_year"].to_numpy(), [years[0], years[1] + 1]
+    )
+    part = df.iloc[lo:hi]
+    columns = [
+        (part["collision_severity"], sev),
+        (part["weather_conditions"], weather),
+        (part["light_conditions"], light),
+        (part["road_type"], road),
+    ]
+    mask = fused_mask(
+        *[col.array.codes for col, _ in columns],
+        *[category_lut(col, selected) for col, selected in columns],
+    )
+    return lo + np.flatnonzero(mask)
+
+
+def normalise(sig):
+    # Selection order does not change the rows, so sort each part; otherwise
+    # the order options were clicked in would cache the same filter twice.
+    return tuple(tuple(sorted(part)) for part in sig)
+
+
+def cache_path(sig):
+    key = f"{data_version()}:{sig!r}".encode()
+    name = hashlib.blake2b(key, digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, f"{name}.npy")
+
+
+def prune_cache():
+    # Drop the oldest entries by mtime (refreshed on every hit). Another
+    # worker may be pruning too, so files can vanish underneath us.
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".npy")]
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for entry in entries[CACHE_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# Only row positions are cached, keyed on the filter signature: the frame is
+# not hashed on every call and no filtered copies pile up in the cache.
+# Behind the in-process cache sits an on-disk one, so a signature computed
+# by one worker is read back by the others instead of being filtered again.
+@st.cache_data(max_entries=CACHE_MAX_FILES)
+def filter_indices(_df, sig):
+    path = cache_path(sig)
+    try:
+        idx = np.load(path)
+        os.utime(path)
+        return idx
+    except (OSError, ValueError):
+        # Missing or unreadable: filter again and overwrite it below.
+        pass
+
+    # int32 positions halve the size of every entry, memory and disk alike.
+    idx = compute_indices(_df, sig).astype(np.int32)
+
+    def save(tmp):
+        with open(tmp, "wb") as f:
+            np.save(f, idx)
+
+    # Written atomically, so concurrent workers never read a partly written
+    # array. The disk cache is only an optimisation, so a read-only or full
+    # disk is ignored.
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        convert.write_atomic(path, save)
+    except OSError:
+        return idx
+    prune_cache()
+    return idx
+
+
+def apply_filters(df, sig):
+    """
+    Return the rows of df matching sig, a (severity, years, weather, light,
+    road) tuple of selected values.
+    """
+    return df.iloc[filter_indices(df, normalise(sig))]
@@ -0,0 +1,281 @@
+// Collision map component.
+//
+// collisions.arrow (written by convert.py) is fetched once when the frame
+// loads. Every render from Streamlit only carries the applied filters and
+// map mode; selecting rows, clustering, heat binning and the viewport
+// queries all happen here, so changing filters never re-sends point data
+// from Python.
+(function () {
+    "use strict";
+
+    var HEAT_GRID_BINS = 1024;
+
+    var map = L.map("map").setView([54.5, -2.5], 6);
+    L.tileLayer("https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png", {
+        attribution: "&copy; <a href=\"https://www.openstreetmap.org/copyright\">OpenStreetMap</a> " +
+            "contributors &copy; <a href=\"https://carto.com/attributions\">CARTO</a>",
+        subdomains: "abcd",
+        maxZoom: 20
+    }).addTo(map);
+
+    var data = null;
+    var pending = null;
+    var lastKey = null;
+    var overlay = null;
+
+    function send(type, extra) {
+        window.parent.postMessage(
+            Object.assign({isStreamlitMessage: true, type: type}, extra),
+            "*"
+        );
+    }
+
+    function loadData(buffer) {
+        var table = Arrow.tableFromIPC(new Uint8Array(buffer));
+        function column(name) {
+            return table.getChild(name).toArray();
+        }
+        return {
+            lat: column("latitude"),
+            lon: column("longitude"),
+            year: column("collision_year"),
+            codes: {
+                severity: column("collision_severity"),
+                weather: column("weather_conditions"),
+                light: column("light_conditions"),
+                road: column("road_type")
+            },
+            categories: JSON.parse(table.schema.metadata.get("categories"))
+        };
+    }
+
+    // Boolean table indexed by category code. Missing values have code -1,
+    // which reads as undefined and so never matches.
+    function lookup(categories, selected) {
+        var lut = new Uint8Array(categories.length);
+        selected.forEach(function (value) {
+            var i = categories.indexOf(value);
+            if (i >= 0) {
+                lut[i] = 1;
+            }
+        });
+        return lut;
+    }
+
+    function lowerBound(values, target) {
+        var lo = 0;
+        var hi = values.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >>> 1;
+            if (values[mid] < target) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+
+    // Row positions matching the filters. Rows are sorted by year, so the
+    // year range is a slice and the category tests run only inside it.
+    function select(args) {
+        var lo = lowerBound(data.year, args.years[0]);
+        var hi = lowerBound(data.year, args.years[1] + 1);
+
+        var cats = data.categories;
+        var sevLut = lookup(cats.collision_severity, args.severity);
+        var weaLut = lookup(cats.weather_conditions, args.weather);
+        var ligLut = lookup(cats.light_conditions, args.light);
+        var roaLut = lookup(cats.road_type, args.road);
+
+        var sev = data.codes.severity;
+        var wea = data.codes.weather;
+        var lig = data.codes.light;
+        var roa = data.codes.road;
+
+        var out = new Uint32Array(Math.max(hi - lo, 0));
+        var n = 0;
+        for (var i = lo; i < hi; i++) {
+            if (sevLut[sev[i]] && weaLut[wea[i]] && ligLut[lig[i]] && roaLut[roa[i]]) {
+                out[n++] = i;
+            }
+        }
+        return out.subarray(0, n);
+    }
+
+    function extent(rows) {
+        var b = {minLat: Infinity, maxLat: -Infinity, minLon: Infinity, maxLon: -Infinity};
+        for (var k = 0; k < rows.length; k++) {
+            var lat = data.lat[rows[k]];
+            var lon = data.lon[rows[k]];
+            if (lat < b.minLat) { b.minLat = lat; }
+            if (lat > b.maxLat) { b.maxLat = lat; }
+            if (lon < b.minLon) { b.minLon = lon; }
+            if (lon > b.maxLon) { b.maxLon = lon; }
+        }
+        return b;
+    }
+
+    function clusterIcon(feature, latlng) {
+        var props = feature.properties;
+        if (!props.cluster) {
+            return L.marker(latlng);
+        }
+        var size = props.point_count < 100 ? "small"
+            : props.point_count < 1000 ? "medium" : "large";
+        return L.marker(latlng, {
+            icon: L.divIcon({
+                html: "<div><span>" + props.point_count_abbreviated + "</span></div>",
+                className: "marker-cluster marker-cluster-" + size,
+                iconSize: L.point(40, 40)
+            })
+        });
+    }
+
+    // Supercluster index over the selected rows; only the clusters in the
+    // viewport are turned into markers, refreshed on every moveend.
+    function clusterLayer(rows) {
+        var features = new Array(rows.length);
+        for (var k = 0; k < rows.length; k++) {
+            var i = rows[k];
+            features[k] = {
+                type: "Feature",
+                properties: {},
+                geometry: {type: "Point", coordinates: [data.lon[i], data.lat[i]]}
+            };
+        }
+        var index = new Supercluster({radius: 60, maxZoom: 16}).load(features);
+
+        var layer = L.geoJson(null, {pointToLayer: clusterIcon});
+        layer.refresh = function () {
+            var b = map.getBounds();
+            layer.clearLayers();
+            layer.addData(index.getClusters(
+                [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()],
+                map.getZoom()
+            ));
+        };
+        layer.on("click", function (e) {
+            var id = e.layer.feature.properties.cluster_id;
+            if (id !== undefined) {
+                map.flyTo(e.latlng, index.getClusterExpansionZoom(id));
+            }
+        });
+        return layer;
+    }
+
+    // Bin the selected rows into a grid over their extent, one weighted
+    // point per occupied cell. Leaflet.heat walks every point it holds on
+    // each redraw, so the cells go into a KDBush index and only those in
+    // the (slightly padded) viewport are handed over, refreshed on moveend.
+    function heatLayer(rows, b) {
+        var latStep = (b.maxLat - b.minLat) / HEAT_GRID_BINS || 1;
+        var lonStep = (b.maxLon - b.minLon) / HEAT_GRID_BINS || 1;
+        var counts = new Uint32Array(HEAT_GRID_BINS * HEAT_GRID_BINS);
+        for (var k = 0; k < rows.length; k++) {
+            var i = rows[k];
+            var y = Math.min(Math.floor((data.lat[i] - b.minLat) / latStep), HEAT_GRID_BINS - 1);
+            var x = Math.min(Math.floor((data.lon[i] - b.minLon) / lonStep), HEAT_GRID_BINS - 1);
+            counts[y * HEAT_GRID_BINS + x]++;
+        }
+
+        var points = [];
+        for (var c = 0; c < counts.length; c++) {
+            if (counts[c]) {
+                var row = Math.floor(c / HEAT_GRID_BINS);
+                var col = c % HEAT_GRID_BINS;
+                points.push([
+                    b.minLat + (row + 0.5) * latStep,
+                    b.minLon + (col + 0.5) * lonStep,
+                    counts[c]
+                ]);
+            }
+        }
+
+        var index = new KDBush(points.length);
+        points.forEach(function (p) { index.add(p[1], p[0]); });
+        index.finish();
+
+        var layer = L.heatLayer([], {minOpacity: 0.5, maxZoom: 18, radius: 8, blur: 12});
+        layer.refresh = function () {
+            var v = map.getBounds().pad(0.1);
+            var ids = index.range(v.getWest(), v.getSouth(), v.getEast(), v.getNorth());
+            layer.setLatLngs(ids.map(function (i) { return points[i]; }));
+        };
+        return layer;
+    }
+
+    function render(args) {
+        send("streamlit:setFrameHeight", {height: args.height});
+        if (data === null) {
+            pending = args;
+            return;
+        }
+
+        // Reruns that do not change the applied filters leave the map as is.
+        var key = JSON.stringify(args);
+        if (key === lastKey) {
+            return;
+        }
+        lastKey = key;
+
+        if (overlay !== null) {
+            map.removeLayer(overlay);
+            overlay = null;
+        }
+
+        var rows = select(args);
+        if (rows.length === 0) {
+            return;
+        }
+
+        var b = extent(rows);
+        map.invalidateSize();
+        map.setView([(b.minLat + b.maxLat) / 2, (b.minLon + b.maxLon) / 2], 6);
+        overlay = args.mode === "Cluster" ? clusterLayer(rows) : heatLayer(rows, b);
+        overlay.addTo(map);
+        if (overlay.refresh) {
+            overlay.refresh();
+        }
+    }
+
+    map.on("moveend", function () {
+        if (overlay !== null && overlay.refresh) {
+            overlay.refresh();
+        }
+    });
+
+    window.addEventListener("message", function (event) {
+        if (event.data.type === "streamlit:render") {
+            render(event.data.args);
+        }
+    });
+
+    // A missing file, or a Git LFS pointer in its place, would otherwise
+    // leave an empty map with no hint of what went wrong.
+    function showError(message) {
+        var box = document.getElementById("error");
+        box.textContent = "Could not load the collision data: " + message;
+        box.style.display = "block";
+    }
+
+    fetch("collisions.arrow")
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error("collisions.arrow returned HTTP " + response.status);
+            }
+            return response.arrayBuffer();
+        })
+        .then(function (buffer) {
+            data = loadData(buffer);
+            if (pending !== null) {
+                render(pending);
+                pending = null;
+            }
+        })
+        .catch(function (err) {
+            showError(err.message);
+        });
+
+    send("streamlit:componentReady", {apiVersion: 1});
+})();